@@ -1,8 +1,15 @@
 """A simple python library for all your investment needs."""
 
 from niveshpy.main import Nivesh
-from importlib.metadata import version
 
 __all__ = ["Nivesh"]
 
-__version__ = version(__name__)
+
+def __getattr__(name: str) -> str:
+    """Resolve `__version__` from package metadata on first access."""
+    if name == "__version__":
+        from importlib.metadata import version
+
+        globals()["__version__"] = version(__name__)
+        return globals()["__version__"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
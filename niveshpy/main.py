@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 
-from collections import defaultdict
 from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import date, datetime, timedelta
+from functools import cache, cached_property
 import logging
 import importlib
 import pkgutil
@@ -36,7 +36,11 @@ import polars as pl
 
 if TYPE_CHECKING:
     import pandas as pd
-    from niveshpy.models.types import NiveshPyOutputType, QuotesIterable
+    from niveshpy.models.types import (
+        NiveshPyOutputType,
+        QuotesIterable,
+        TickersIterable,
+    )
 
 logger = logging.getLogger(__name__)
 
@@ -58,17 +62,23 @@ def _import_plugin(name: str) -> Plugin | None:
     return None
 
 
-def _import_local_plugins() -> Iterable[Plugin]:
-    """Import all local plugins."""
-    return filter(
-        None,
-        (
-            _import_plugin(name)
-            for _, name, ispkg in pkgutil.iter_modules(
-                _local_plugins.__path__, "niveshpy.plugins."
-            )
-            if not ispkg
-        ),
+@cache
+def _import_local_plugins() -> tuple[Plugin, ...]:
+    """Import all local plugins.
+
+    The result is cached, so local plugins are only discovered once per process.
+    """
+    return tuple(
+        filter(
+            None,
+            (
+                _import_plugin(name)
+                for _, name, ispkg in pkgutil.iter_modules(
+                    _local_plugins.__path__, "niveshpy.plugins."
+                )
+                if not ispkg
+            ),
+        )
     )
 
 
@@ -77,31 +87,40 @@ class Nivesh:
 
     def __init__(self) -> None:
         """Initialize the Nivesh class."""
-        logger.debug("Initializing Nivesh")
-        local_plugins = _import_local_plugins()
-        self.plugins: list[Plugin] = []
-        for plugin in local_plugins:
-            logger.debug(f"Loaded plugin: {plugin.get_info()}")
-            self.plugins.append(plugin)
-        logger.debug(f"Loaded {len(self.plugins)} plugins")
         logger.debug("Nivesh initialized")
 
+    @cached_property
+    def plugins(self) -> list[Plugin]:
+        """List of all plugins.
+
+        Local plugins are imported on first access.
+        """
+        logger.debug("Loading local plugins")
+        plugins = list(_import_local_plugins())
+        if logger.isEnabledFor(logging.DEBUG):
+            for plugin in plugins:
+                logger.debug("Loaded plugin: %s", plugin.get_info())
+        logger.debug("Loaded %d plugins", len(plugins))
+        return plugins
+
     def register_plugin(self, plugin: Plugin):
         """Register a custom plugin."""
         if isinstance(plugin, Plugin):
             self.plugins.append(plugin)
-            logger.info(f"Registered plugin: {plugin.get_info()}")
+            logger.info("Registered plugin: %s", plugin.get_info())
         else:
             raise TypeError("Plugin must be an instance of Plugin class")
 
     def _get_sources(self, source_keys: list[str] | None = None) -> Iterable[Source]:
         """Get the list of sources from all plugins."""
         logger.debug("Getting sources from all plugins")
+        key_filter = None if source_keys is None else frozenset(source_keys)
         for plugin in self.plugins:
             for source in plugin.get_sources():
-                if source_keys is None or source.get_source_key() in source_keys:
+                if key_filter is None or source.get_source_key() in key_filter:
                     yield source
-                    logger.debug(f"Loaded source: {source.get_source_info()}")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Loaded source: %s", source.get_source_info())
 
     def get_sources(self, source_keys: list[str] | None = None) -> Iterable[SourceInfo]:
         """Get the list of sources from all plugins.
@@ -193,102 +212,153 @@ class Nivesh:
                 - source_key: The source key of the ticker.
                 - last_updated: The last updated date of the source.
         """
-        df_tickers = (
-            Ticker.get_polars_schema()
-            .to_frame(eager=False)
-            .with_columns(
-                pl.lit(None).cast(pl.String()).alias("source_key"),
-            )
-        )
-        pre_loaded_sources: dict[str, datetime] = {}
         try:
             logger.debug("Getting locally saved tickers")
             df_tickers_pre = load_tickers()
             logger.debug("Loaded locally saved tickers")
-            df_sources = (
-                df_tickers_pre.group_by("source_key")
-                .agg(pl.min("last_updated").alias("last_updated"))
-                .collect()
-            )
-            for row in df_sources.iter_rows(named=True):
-                source_key = row["source_key"]
-                last_updated = row["last_updated"]
-                pre_loaded_sources[source_key] = last_updated
         except FileNotFoundError:
             logger.debug("No locally saved tickers found")
-            df_tickers_pre = df_tickers.clone().with_columns(
-                pl.lit(None).cast(pl.Datetime()).alias("last_updated"),
+            df_tickers_pre = (
+                Ticker.get_polars_schema()
+                .to_frame(eager=False)
+                .with_columns(
+                    pl.lit(None).cast(pl.String()).alias("source_key"),
+                    pl.lit(None).cast(pl.Datetime()).alias("last_updated"),
+                )
             )
 
         logger.debug("Getting tickers from all plugins")
-        all_tickers = [df_tickers]
-        for source in self._get_sources(source_keys):
-            # This will run for all sources matching the source_keys (if applicable)
-            key = source.get_source_key()
-            refresh_interval = source.get_source_config().ticker_refresh_interval
-            if key in pre_loaded_sources and (
-                refresh_interval is None
-                or (datetime.now() - pre_loaded_sources[key]) < refresh_interval
-            ):
-                logger.debug(f"Skipping source {key} as it is up to date")
-            else:
-                logger.debug(f"Getting tickers from source {key}")
-                all_tickers.append(
-                    handle_input(
-                        source.get_tickers(), Ticker.get_polars_schema()
-                    ).with_columns(pl.lit(key).alias("source_key"))
-                )
+        now = datetime.now()
+        all_tickers: list[pl.DataFrame] = []
+        # Filters are combined using OR, so a source_key filter can only narrow
+        # down the sources to fetch when no other ticker column is filtered.
+        fetch_source_keys = source_keys
+        if (
+            filters
+            and "source_key" in filters
+            and not filters.keys() & {*Ticker._fields, "last_updated"}
+        ):
+            fetch_source_keys = [
+                key
+                for key in filters["source_key"]
+                if source_keys is None or key in source_keys
+            ]
 
-        logger.debug("Combining tickers from all plugins")
-        df_tickers = pl.concat(all_tickers, how="vertical_relaxed").select(
-            pl.col("symbol").cast(pl.String()),
-            pl.col("name").cast(pl.String()),
-            pl.col("isin").cast(pl.String()),
-            pl.col("source_key").cast(pl.String()),
-            pl.lit(datetime.now()).alias("last_updated"),
+        # This will include all sources matching the source_keys (if applicable)
+        sources = {
+            source.get_source_key(): source
+            for source in self._get_sources(fetch_source_keys)
+        }
+        df_refresh_intervals = pl.LazyFrame(
+            {
+                "source_key": list(sources),
+                "refresh_interval": [
+                    source.get_source_config().ticker_refresh_interval
+                    for source in sources.values()
+                ],
+            },
+            schema={"source_key": pl.String(), "refresh_interval": pl.Duration()},
+        )
+        # A source is up to date if its tickers were saved before and either
+        # it is never refreshed or its refresh interval has not elapsed yet.
+        up_to_date_keys = set(
+            df_tickers_pre.group_by("source_key")
+            .agg(pl.min("last_updated").alias("last_updated"))
+            .join(df_refresh_intervals, on="source_key")
+            .filter(
+                pl.col("refresh_interval").is_null()
+                | ((pl.lit(now) - pl.col("last_updated")) < pl.col("refresh_interval"))
+            )
+            .select("source_key")
+            .collect()
+            .to_series()
         )
 
-        df_tickers_collected = df_tickers.collect()
-        if df_tickers_collected.height > 0:
-            logger.debug("Combining tickers with locally saved tickers")
-            df_tickers_collected = df_tickers_pre.collect().update(
-                df_tickers_collected,
-                on=["source_key", "symbol"],
-                how="full",
+        sources_to_fetch: dict[str, Source] = {}
+        for key, source in sources.items():
+            if key in up_to_date_keys:
+                logger.debug("Skipping source %s as it is up to date", key)
+            else:
+                sources_to_fetch[key] = source
+
+        if sources_to_fetch:
+            with ThreadPoolExecutor(
+                max_workers=min(8, len(sources_to_fetch))
+            ) as executor:
+                ticker_futures: dict[Future[TickersIterable], str] = {}
+                for key, source in sources_to_fetch.items():
+                    logger.debug("Getting tickers from source %s", key)
+                    ticker_futures[executor.submit(source.get_tickers)] = key
+
+                ticker_schema = Ticker.get_polars_schema()
+                # Results are gathered in submission order for a stable output.
+                for future, key in ticker_futures.items():
+                    try:
+                        # Collect here, so that a lazy frame failing to
+                        # compute only skips its own source.
+                        all_tickers.append(
+                            handle_input(future.result(), ticker_schema)
+                            .with_columns(pl.lit(key).alias("source_key"))
+                            .collect()
+                        )
+                    except Exception:
+                        logger.exception("Error getting tickers from %s", key)
+
+        # Tickers are only materialized when something was fetched, otherwise
+        # the locally saved tickers are filtered and returned lazily.
+        df_tickers_collected = None
+        if all_tickers:
+            logger.debug("Combining tickers from all plugins")
+            df_tickers_collected = (
+                pl.concat(all_tickers, how="vertical_relaxed", rechunk=False)
+                .lazy()
+                .select("symbol", "name", "isin", "source_key")
+                .with_columns(pl.lit(now).alias("last_updated"))
+                .collect()
             )
+        if df_tickers_collected is not None and df_tickers_collected.height > 0:
+            logger.debug("Combining tickers with locally saved tickers")
+            df_tickers_collected = pl.concat(
+                [
+                    df_tickers_pre.join(
+                        df_tickers_collected.lazy().select("source_key", "symbol"),
+                        on=["source_key", "symbol"],
+                        how="anti",
+                    ),
+                    df_tickers_collected.lazy(),
+                ],
+                how="vertical_relaxed",
+                rechunk=False,
+            ).collect()
 
             logger.debug("Saving all tickers to local file")
             save_tickers(df_tickers_collected)
+            df_tickers_pre = df_tickers_collected.lazy()
         else:
             logger.debug("No new tickers found")
-            df_tickers_collected = df_tickers_pre.collect()
 
         logger.debug("Applying filters to tickers")
-        df_tickers_collected = apply_filters(df_tickers_collected, source_keys, filters)
-        return format_output(df_tickers_collected, format)
+        return format_output(
+            apply_filters(df_tickers_pre, source_keys, filters), format
+        )
 
     def _handle_tickers(self, *tickers: str | tuple[str, str]) -> pl.DataFrame:
         """Handle the input tickers and return a DataFrame with the requested tickers."""
-        tickers_grouped: dict[str | None, list[str]] = defaultdict(list)
+        symbols: list[str] = []
+        source_keys: list[str | None] = []
         for ticker in tickers:
             if isinstance(ticker, str):
-                tickers_grouped[None].append(ticker)
+                symbols.append(ticker)
+                source_keys.append(None)
             elif isinstance(ticker, tuple) and len(ticker) == 2:
-                tickers_grouped[ticker[1]].append(ticker[0])
+                symbols.append(ticker[0])
+                source_keys.append(ticker[1])
             else:
                 raise ValueError("Invalid ticker format", ticker)
 
-        df_requested_tickers = pl.concat(
-            [
-                pl.DataFrame(
-                    {
-                        "symbol": tickers_grouped[source_key],
-                        "source_key": source_key,
-                    },
-                    schema_overrides={"source_key": pl.Utf8},
-                )
-                for source_key in tickers_grouped
-            ]
+        df_requested_tickers = pl.DataFrame(
+            {"symbol": symbols, "source_key": source_keys},
+            schema={"symbol": pl.Utf8, "source_key": pl.Utf8},
         )
 
         if logger.isEnabledFor(logging.DEBUG):
@@ -296,23 +366,24 @@ class Nivesh:
             logger.debug(df_requested_tickers)
 
         # Find the sources for requested tickers where source_key is None
-
-        df_tickers_matched = self.get_tickers(
-            filters=df_requested_tickers.filter(pl.col("source_key").is_null())
-            .select("symbol")
-            .to_dict(as_series=False),
-            format=ReturnFormat.PL_DATAFRAME,
+        df_unresolved = df_requested_tickers.filter(pl.col("source_key").is_null())
+        if df_unresolved.height == 0:
+            return df_requested_tickers
+
+        df_tickers_matched = (
+            self.get_tickers(format=ReturnFormat.PL_LAZYFRAME)
+            .join(df_unresolved.lazy().select("symbol"), on="symbol", how="semi")
+            .collect()
         )
 
         unknown_tickers = (
-            df_requested_tickers.filter(pl.col("source_key").is_null())
-            .join(
+            df_unresolved.join(
                 df_tickers_matched,
                 on="symbol",
                 how="anti",
             )
-            .select("symbol")
-            .to_dict(as_series=False)["symbol"]
+            .get_column("symbol")
+            .to_list()
         )
         if len(unknown_tickers) > 0:
             warnings.warn(
@@ -337,12 +408,15 @@ class Nivesh:
         end_date: date | None = None,
     ):
         """Helper function to get quotes from a single source."""
-        source_strategy = source.get_source_config().source_strategy
+        # Freeze the symbols, as they are iterated more than once below.
+        symbols = tuple(symbols)
+        source_config = source.get_source_config()
+        source_strategy = source_config.source_strategy
+        is_single_quote = SourceStrategy.SINGLE_QUOTE in source_strategy
+        is_all_tickers = SourceStrategy.ALL_TICKERS in source_strategy
         source_key = source.get_source_key()
         schema = (
-            Quote.get_polars_schema()
-            if SourceStrategy.SINGLE_QUOTE in source_strategy
-            else OHLC.get_polars_schema()
+            Quote.get_polars_schema() if is_single_quote else OHLC.get_polars_schema()
         )
 
         # Get locally saved quotes
@@ -351,7 +425,7 @@ class Nivesh:
         actual_start_date = (
             start_date
             if start_date
-            else date.today() - source.get_source_config().data_refresh_interval
+            else date.today() - source_config.data_refresh_interval
         )
         actual_end_date = end_date if end_date else date.today()
 
@@ -362,20 +436,13 @@ class Nivesh:
         ).alias("date")
 
         df_date_range = pl.LazyFrame().select(date_range)
+        df_symbols = pl.LazyFrame({"symbol": symbols}, schema={"symbol": pl.Utf8})
 
-        group_period = source.get_source_config().data_group_period
+        group_period = source_config.data_group_period
 
-        if SourceStrategy.ALL_TICKERS not in source_strategy:
-            df_available = df_quotes.filter(pl.col("symbol").is_in(symbols))
-            df_date_range = df_date_range.join(
-                pl.LazyFrame(
-                    {
-                        "symbol": symbols,
-                    },
-                    schema_overrides={"symbol": pl.Utf8},
-                ),
-                how="cross",
-            )
+        if not is_all_tickers:
+            df_available = df_quotes.join(df_symbols, on="symbol", how="semi")
+            df_date_range = df_date_range.join(df_symbols, how="cross")
             df_missing = df_date_range.join(
                 df_available,
                 on=["symbol", "date"],
@@ -426,24 +493,32 @@ class Nivesh:
                 )
 
         # Get unavailable quotes from the source
-        new_quotes = [schema.to_frame(eager=False)]
+        new_quotes: list[pl.LazyFrame] = []
 
-        data_refresh_threshold = (
-            date.today() - source.get_source_config().data_refresh_interval
-        )
+        data_refresh_threshold = date.today() - source_config.data_refresh_interval
+
+        # Extract the missing date windows as plain lists instead of
+        # iterating over the frame row by row.
+        df_missing_collected = df_missing.collect()
+        if group_period:
+            starts = df_missing_collected.get_column("start_date").to_list()
+            ends = df_missing_collected.get_column("end_date").to_list()
+        else:
+            starts = ends = df_missing_collected.get_column("date").to_list()
 
         with ThreadPoolExecutor() as executor:
             futures: list[tuple[Future[QuotesIterable], date, date]] = []
 
-            for row in df_missing.collect().iter_rows(named=True):
-                start = row.get("start_date", row.get("date"))
-                end = row.get("end_date", row.get("date"))
-
-                if SourceStrategy.ALL_TICKERS in source_strategy:
+            for start, end in zip(starts, ends):
+                if is_all_tickers:
                     # CASE 1: ALL_TICKERS
                     if start > data_refresh_threshold:
                         logger.debug(
-                            f"Skipping source {source_key} for {start} to {end} as it is beyond the refresh interval"
+                            "Skipping source %s for %s to %s as it is beyond "
+                            "the refresh interval",
+                            source_key,
+                            start,
+                            end,
                         )
                         continue
 
@@ -467,11 +542,13 @@ class Nivesh:
                     futures.append((f, start, end))
 
             for future, start, end in futures:
-                logger.debug(f"Received quotes from {source_key} for {start} to {end}")
+                logger.debug(
+                    "Received quotes from %s for %s to %s", source_key, start, end
+                )
                 try:
                     new_quotes.append(handle_input(future.result(), schema=schema))
 
-                    if SourceStrategy.ALL_TICKERS in source_strategy:
+                    if is_all_tickers:
                         # Mark the quotes as available
                         mark_quotes_as_available(
                             source_key,
@@ -481,63 +558,50 @@ class Nivesh:
                 except Exception:
                     logger.exception(f"Error getting quotes from {source_key}")
 
-        if SourceStrategy.SINGLE_QUOTE in source_strategy:
-            df_new = (
-                pl.concat(new_quotes, how="vertical_relaxed")
-                .select(
-                    pl.col("symbol").cast(pl.String()),
-                    pl.col("date").cast(pl.Date()),
-                    pl.col("price").cast(pl.Decimal(scale=4)),
+        # Inputs are cast to the schema in handle_input, so only project here
+        df_new = (
+            pl.concat(new_quotes, how="vertical_relaxed")
+            .select(schema.names())
+            .collect()
+            if new_quotes
+            else schema.to_frame()
+        )
+
+        if df_new.height > 0:
+            # Update the quotes with the new data, keeping the saved values
+            # wherever the new data is null.
+            df_quotes_collected = (
+                df_quotes.join(
+                    df_new.lazy(),
+                    on=["symbol", "date"],
+                    how="full",
+                    coalesce=True,
+                    suffix="_new",
                 )
-                .collect()
-            )
-        else:
-            df_new = (
-                pl.concat(new_quotes, how="vertical_relaxed")
                 .select(
-                    pl.col("symbol").cast(pl.String()),
-                    pl.col("date").cast(pl.Date()),
-                    pl.col("open").cast(pl.Decimal(scale=4)),
-                    pl.col("high").cast(pl.Decimal(scale=4)),
-                    pl.col("low").cast(pl.Decimal(scale=4)),
-                    pl.col("close").cast(pl.Decimal(scale=4)),
+                    "symbol",
+                    "date",
+                    *(
+                        pl.coalesce(f"{column}_new", column).alias(column)
+                        for column in schema.names()
+                        if column not in ("symbol", "date")
+                    ),
                 )
-                .collect()
+                .sort("date")
+                .collect(engine="streaming")
             )
-
-        if df_new.height > 0:
-            # Update the quotes with the new data
-            df_quotes_collected = df_quotes.collect()
-            df_quotes_collected = df_quotes_collected.update(
-                df_new, on=["symbol", "date"], how="full"
-            ).sort("date")
             # Save the quotes to a local file
             save_quotes(df_quotes_collected, source_key)
 
             df_quotes = df_quotes_collected.lazy()
 
         df_quotes = df_quotes.filter(
-            pl.col("symbol").is_in(symbols)
-            & pl.col("date").is_between(actual_start_date, actual_end_date)
-        )
+            pl.col("date").is_between(actual_start_date, actual_end_date)
+        ).join(df_symbols, on="symbol", how="semi", maintain_order="left")
 
-        if SourceStrategy.SINGLE_QUOTE in source_strategy:
-            return df_quotes.select(
-                pl.col("symbol").cast(pl.String()),
-                pl.col("date").cast(pl.Date()),
-                pl.col("price").cast(pl.Decimal(scale=4)),
-                pl.lit(source_key).alias("source_key"),
-            ).collect()
-        else:
-            return df_quotes.select(
-                pl.col("symbol").cast(pl.String()),
-                pl.col("date").cast(pl.Date()),
-                pl.col("open").cast(pl.Decimal(scale=4)),
-                pl.col("high").cast(pl.Decimal(scale=4)),
-                pl.col("low").cast(pl.Decimal(scale=4)),
-                pl.col("close").cast(pl.Decimal(scale=4)),
-                pl.lit(source_key).alias("source_key"),
-            ).collect()
+        return df_quotes.select(
+            *schema.names(), pl.lit(source_key).alias("source_key")
+        ).collect()
 
     @overload
     def get_quotes(
@@ -652,29 +716,22 @@ class Nivesh:
                 format,
             )
 
-        sources = self._get_sources(
-            source_keys=df_requested_tickers.select("source_key")
-            .unique()
-            .to_series()
-            .to_list()
-        )
+        # Split the requested symbols by source in a single pass.
+        symbols_by_source: dict[str, list[str]] = {
+            source_key: df.get_column("symbol").to_list()
+            for (source_key,), df in df_requested_tickers.partition_by(
+                "source_key", as_dict=True
+            ).items()
+        }
+        sources = self._get_sources(source_keys=list(symbols_by_source))
 
-        quotes = [
-            schema.to_frame(eager=True).with_columns(
-                pl.lit(None).cast(pl.String()).alias("source_key")
-            )
-        ]
+        quotes: list[pl.LazyFrame] = []
 
         with ThreadPoolExecutor() as executor:
             futures = {
                 executor.submit(
                     self._get_quotes,
-                    df_requested_tickers.filter(
-                        pl.col("source_key") == pl.lit(source.get_source_key())
-                    )
-                    .select("symbol")
-                    .to_series()
-                    .to_list(),
+                    symbols_by_source[source.get_source_key()],
                     source,
                     start_date,
                     end_date,
@@ -684,18 +741,17 @@ class Nivesh:
 
             for future in futures:
                 source = futures[future]
+                source_key = source.get_source_key()
+                is_single_quote = (
+                    SourceStrategy.SINGLE_QUOTE
+                    in source.get_source_config().source_strategy
+                )
                 try:
-                    q = future.result()
+                    q = future.result().lazy()
                 except Exception:
-                    logger.exception(
-                        f"Error getting quotes from {source.get_source_key()}"
-                    )
+                    logger.exception(f"Error getting quotes from {source_key}")
                 else:
-                    if (
-                        ohlc
-                        and SourceStrategy.SINGLE_QUOTE
-                        in source.get_source_config().source_strategy
-                    ):
+                    if ohlc and is_single_quote:
                         # If the source returns a single quote, we need to convert it to OHLC
                         # by duplicating the quote for open, high, low, and close
                         q = q.select(
@@ -705,28 +761,29 @@ class Nivesh:
                             pl.col("price").alias("high"),
                             pl.col("price").alias("low"),
                             pl.col("price").alias("close"),
-                            pl.lit(source.get_source_key()).alias("source_key"),
+                            pl.col("source_key"),
                         )
-                    elif (
-                        not ohlc
-                        and SourceStrategy.SINGLE_QUOTE
-                        not in source.get_source_config().source_strategy
-                    ):
+                    elif not ohlc and not is_single_quote:
                         # If the source returns OHLC data, we need to convert it to a single quote
                         # by taking only the close price
                         q = q.select(
                             pl.col("symbol").alias("symbol"),
                             pl.col("date").alias("date"),
                             pl.col("close").alias("price"),
-                            pl.lit(source.get_source_key()).alias("source_key"),
+                            pl.col("source_key"),
                         )
 
                     quotes.append(q)
                     if logger.isEnabledFor(logging.DEBUG):
-                        logger.debug(f"Quotes from source {source.get_source_key()}:")
-                        logger.debug(q)
+                        logger.debug("Quotes from source %s:", source_key)
+                        logger.debug(q.collect())
 
-        df_final_quotes = pl.concat(quotes)
+        if quotes:
+            df_final_quotes = pl.concat(quotes, parallel=True)
+        else:
+            df_final_quotes = schema.to_frame(eager=False).with_columns(
+                pl.lit(None).cast(pl.String()).alias("source_key")
+            )
 
         if resample:
             if ohlc:
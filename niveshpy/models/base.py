@@ -3,6 +3,7 @@
 from datetime import date, timedelta
 from decimal import Decimal
 from enum import Flag, auto
+from functools import cache
 from typing import Optional, NamedTuple
 
 import polars as pl
@@ -16,6 +17,7 @@ class Ticker(NamedTuple):
     isin: Optional[str]
 
     @classmethod
+    @cache
     def get_polars_schema(cls) -> pl.Schema:
         """Get the Polars schema for the Ticker class."""
         return pl.Schema(
@@ -38,6 +40,7 @@ class OHLC(NamedTuple):
     close: Decimal
 
     @classmethod
+    @cache
     def get_polars_schema(cls) -> pl.Schema:
         """Get the Polars schema for the OHLC class."""
         return pl.Schema(
@@ -60,6 +63,7 @@ class Quote(NamedTuple):
     price: Decimal
 
     @classmethod
+    @cache
     def get_polars_schema(cls) -> pl.Schema:
         """Get the Polars schema for the Quote class."""
         return pl.Schema(
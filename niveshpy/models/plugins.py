@@ -2,24 +2,19 @@
 
 import abc
 from collections.abc import Iterable
+from typing import NamedTuple
 
 from niveshpy.models.sources import Source
 
 
-class PluginInfo:
+class PluginInfo(NamedTuple):
     """Class to hold plugin information."""
 
-    def __init__(self, name, description, version, author, author_email):
-        """Initialize the plugin info."""
-        self.name = name
-        self.description = description
-        self.version = version
-        self.author = author
-        self.author_email = author_email
-
-    def __repr__(self):
-        """Return a string representation of the plugin info."""
-        return f'PluginInfo(name="{self.name}", description="{self.description}", version="{self.version}", author="{self.author}", author_email="{self.author_email}")'
+    name: str
+    description: str
+    version: str
+    author: str
+    author_email: str
 
 
 class Plugin(abc.ABC):
@@ -20,10 +20,10 @@ PolarsFrameType = Union[pl.DataFrame, pl.LazyFrame]
 
 NiveshPyType = Union[Ticker, Quote, OHLC, SourceInfo, SourceConfig]
 
-QuotesIterable = Union[Iterable[Quote], Iterable[OHLC], PolarsFrameType]
-TickersIterable = Union[Iterable[Ticker], PolarsFrameType]
+QuotesIterable = Union[Iterable[Quote], Iterable[OHLC], PolarsFrameType, pd.DataFrame]
+TickersIterable = Union[Iterable[Ticker], PolarsFrameType, pd.DataFrame]
 
-NiveshPyIterable = Union[PolarsFrameType, Iterable[NiveshPyType]]
+NiveshPyIterable = Union[PolarsFrameType, pd.DataFrame, Iterable[NiveshPyType]]
 
 NiveshPyOutputType = Union[
     dict[str, list], pl.DataFrame, pl.LazyFrame, pd.DataFrame, str
@@ -1,36 +1,76 @@
 """A built-in plugin for NiveshPy that provides AMFI as a source."""
 
-from datetime import timedelta
+from datetime import date, timedelta
+from functools import cache, cached_property, lru_cache
 import logging
 import niveshpy
-from niveshpy.models.base import SourceConfig, SourceInfo, SourceStrategy
+from niveshpy.models.base import SourceConfig, SourceInfo, SourceStrategy, Ticker
 from niveshpy.models.plugins import Plugin, PluginInfo
 from niveshpy.models.sources import Source
 import polars as pl
 
 logger = logging.getLogger(__name__)
 
+_MONTHS = (
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+)
+
+# Expressions mapping AMFI NAV file columns to the NiveshPy models.
+_QUOTE_COLUMNS = (
+    pl.col("Scheme Code").alias("symbol").cast(pl.String()),
+    # Dates repeat across most rows, so cache the parsed values.
+    pl.col("Date").alias("date").str.to_date("%d-%b-%Y", cache=True),
+    pl.col("Net Asset Value").alias("price").cast(pl.Decimal(None, 4)),
+)
+_TICKER_COLUMNS = (
+    pl.col("Scheme Code").alias("symbol"),
+    pl.col("Scheme Name").alias("name"),
+    pl.coalesce(pl.col("^ISIN .*$")).alias("isin"),
+)
+
+
+def _format_date(value: date) -> str:
+    """Format a date the way AMFI expects it in URLs, e.g. 05-Jan-2024.
+
+    Unlike `strftime("%d-%b-%Y")`, this does not depend on the current locale.
+    """
+    return f"{value.day:02d}-{_MONTHS[value.month - 1]}-{value.year:04d}"
+
 
 class AMFIPlugin(Plugin):
     """AMFI Plugin for NiveshPy."""
 
-    plugin_info = PluginInfo(
-        name="AMFI",
-        description="AMFI plugin for NiveshPy",
-        version=niveshpy.__version__,
-        author="Yashovardhan Dhanania",
-        author_email="",
-    )
-
     def __init__(self) -> None:
         """Initialize the AMFI plugin."""
         super().__init__()
-        self.sources = [AMFISource()]
+
+    @cached_property
+    def sources(self) -> tuple[Source, ...]:
+        """Sources provided by the plugin, created on first access."""
+        return (AMFISource(),)
 
     @classmethod
+    @cache
     def get_info(cls) -> PluginInfo:
-        """Return plugin information."""
-        return cls.plugin_info
+        """Return plugin information, reading the package version on first call."""
+        return PluginInfo(
+            name="AMFI",
+            description="AMFI plugin for NiveshPy",
+            version=niveshpy.__version__,
+            author="Yashovardhan Dhanania",
+            author_email="",
+        )
 
     def get_sources(self):
         """Return a list of sources for the plugin."""
@@ -45,6 +85,20 @@ class AMFISource(Source):
     LATEST_URL = "http://amfiindia.com/spages/NAVAll.txt"
     HISTORICAL_URL = "https://portal.amfiindia.com/DownloadNAVHistoryReport_Po.aspx?frmdt={frm_dt}&todt={to_dt}"
 
+    source_key = "amfi"
+    source_info = SourceInfo(
+        name="Mutual Fund India",
+        description="Data source for all Indian mutual funds, sourced from AMFI.",
+        key=source_key,
+        version=1,
+    )
+    source_config = SourceConfig(
+        ticker_refresh_interval=timedelta(days=7),
+        data_refresh_interval=timedelta(days=1),
+        data_group_period=timedelta(days=30),
+        source_strategy=SourceStrategy.ALL_TICKERS | SourceStrategy.SINGLE_QUOTE,
+    )
+
     def __init__(self) -> None:
         """Initialize the AMFI source."""
         super().__init__()
@@ -52,80 +106,74 @@ class AMFISource(Source):
 
     def get_quotes(self, *_, start_date=None, end_date=None):
         """Get quotes for the all tickers."""
-        url = self.LATEST_URL
-        if start_date and end_date:
-            url = self.HISTORICAL_URL.format(
-                frm_dt=start_date.strftime("%d-%b-%Y"),
-                to_dt=end_date.strftime("%d-%b-%Y"),
-            )
-        elif start_date:
-            url = self.HISTORICAL_URL.format(
-                frm_dt=start_date.strftime("%d-%b-%Y"),
-                to_dt=start_date.strftime("%d-%b-%Y"),
-            )
-        elif end_date:
-            url = self.HISTORICAL_URL.format(
-                frm_dt=end_date.strftime("%d-%b-%Y"),
-                to_dt=end_date.strftime("%d-%b-%Y"),
+        # A single date on either side requests the report for that day only.
+        if start_date or end_date:
+            url = self._build_url(start_date or end_date, end_date or start_date)
+        else:
+            url = self.LATEST_URL
+
+        # Only parse the columns needed for quotes. The remaining steps run
+        # as one lazy plan over the parsed frame.
+        return (
+            pl.read_csv(
+                url,
+                separator=";",
+                null_values=["N.A.", "-"],
+                infer_schema=False,
+                columns=["Scheme Code", "Date", "Net Asset Value"],
             )
-
-        df = pl.read_csv(
-            url,
-            separator=";",
-            null_values=["N.A.", "-"],
-            infer_schema=False,
+            .lazy()
+            .drop_nulls(subset=["Date"])
+            .select(_QUOTE_COLUMNS)
+            .collect()
         )
-        df = df.drop_nulls(subset=["Date"])
-        df = df.select(
-            pl.col("Scheme Code").alias("symbol").cast(pl.String()),
-            pl.col("Date").alias("date").str.strptime(pl.Date, "%d-%b-%Y"),
-            pl.col("Net Asset Value").alias("price").cast(pl.Decimal(None, 4)),
-        )
-        return df
 
     def get_tickers(self):
         """Get the list of tickers."""
         try:
-            df = pl.scan_csv(
-                self.LATEST_URL,
-                separator=";",
-                null_values=["N.A.", "-"],
-                infer_schema=False,
-            )
-            df = df.drop_nulls(subset=["Date"])
-            return df.select(
-                pl.col("Scheme Code").alias("symbol"),
-                pl.col("Scheme Name").alias("name"),
-                pl.coalesce(pl.col("^ISIN .*$")).alias("isin"),
+            return (
+                pl.read_csv(
+                    self.LATEST_URL,
+                    separator=";",
+                    null_values=["N.A.", "-"],
+                    infer_schema=False,
+                )
+                .lazy()
+                .drop_nulls(subset=["Date"])
+                .select(_TICKER_COLUMNS)
+                .unique(subset=["symbol"], keep="first", maintain_order=False)
+                .collect()
             )
         except Exception:
             logger.exception("Failed to get tickers")
-            return []
+            return Ticker.get_polars_schema().to_frame()
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def _build_url(start_date: date, end_date: date) -> str:
+        """Build the historical NAV report URL for a date range.
+
+        URLs are cached, as the same recent ranges are requested repeatedly.
+        """
+        return AMFISource.HISTORICAL_URL.format(
+            frm_dt=_format_date(start_date),
+            to_dt=_format_date(end_date),
+        )
 
     @classmethod
     def get_source_key(cls):
         """Return the source key."""
-        return "amfi"
+        return cls.source_key
 
     @classmethod
     def get_source_info(cls):
         """Return source information."""
-        return SourceInfo(
-            name="Mutual Fund India",
-            description="Data source for all Indian mutual funds, sourced from AMFI.",
-            key=AMFISource.get_source_key(),
-            version=1,
-        )
+        return cls.source_info
 
     @classmethod
     def get_source_config(cls):
         """Return source configuration."""
-        return SourceConfig(
-            ticker_refresh_interval=timedelta(days=7),
-            data_refresh_interval=timedelta(days=1),
-            data_group_period=timedelta(days=30),
-            source_strategy=SourceStrategy.ALL_TICKERS | SourceStrategy.SINGLE_QUOTE,
-        )
+        return cls.source_config
 
 
 def register_plugin() -> AMFIPlugin:
@@ -11,6 +11,8 @@ Test Functions:
     test_file_download_invalid_url: Tests that `download_file` handles invalid URLs gracefully and logs an error.
 """
 
+from datetime import date
+
 from niveshpy.plugins import amfi
 from niveshpy.models.plugins import PluginInfo, Plugin
 
@@ -28,3 +30,15 @@ def test_get_plugin_info():
     plugin_info = plugin.get_info()
     assert plugin_info is not None
     assert isinstance(plugin_info, PluginInfo)
+
+
+def test_format_date():
+    """Test that dates are formatted the way AMFI expects them."""
+    assert amfi._format_date(date(2024, 1, 5)) == "05-Jan-2024"
+    assert amfi._format_date(date(2023, 12, 31)) == "31-Dec-2023"
+
+
+def test_build_url():
+    """Test that historical NAV report URLs include both formatted dates."""
+    url = amfi.AMFISource._build_url(date(2024, 1, 5), date(2024, 2, 1))
+    assert url.endswith("frmdt=05-Jan-2024&todt=01-Feb-2024")
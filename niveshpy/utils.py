@@ -2,11 +2,17 @@
 
 from __future__ import annotations
 
+import io
 import logging
+import os
+import sys
+from collections.abc import Callable, Iterable, Sequence
 from datetime import date
+from functools import cache
+from itertools import repeat
 from multiprocessing import Lock
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any, cast
 
 import platformdirs
 import polars as pl
@@ -19,6 +25,7 @@ if TYPE_CHECKING:
     from niveshpy.models.types import (
         NiveshPyIterable,
         NiveshPyOutputType,
+        NiveshPyType,
         PolarsFrame,
         PolarsFrameType,
     )
@@ -26,26 +33,115 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+_PARQUET_COMPRESSIONS = ("uncompressed", "snappy", "gzip", "brotli", "lz4", "zstd")
+
+
+@cache
+def _parquet_options() -> dict[str, Any]:
+    """Get the shared options for every parquet file written by niveshpy.
+
+    Set NIVESHPY_PARQUET_COMPRESSION (e.g. "uncompressed") to trade disk space
+    for faster scans on local storage. It is validated on the first write, so
+    reading saved data works regardless of its value.
+
+    Raises:
+        ValueError: If NIVESHPY_PARQUET_COMPRESSION is not a supported codec.
+    """
+    compression = os.environ.get("NIVESHPY_PARQUET_COMPRESSION", "zstd").lower()
+    if compression not in _PARQUET_COMPRESSIONS:
+        raise ValueError(
+            f"Invalid NIVESHPY_PARQUET_COMPRESSION {compression!r}, "
+            f"expected one of {', '.join(_PARQUET_COMPRESSIONS)}"
+        )
+    return {
+        "compression": compression,
+        "compression_level": 3,
+        "statistics": True,
+        "row_group_size": 500_000,
+    }
+
+
+@cache
+def _get_data_dir() -> Path:
+    """Get the user data directory for niveshpy."""
+    return platformdirs.user_data_path("niveshpy")
+
 
 def get_tickers_dir() -> Path:
     """Get the directory for tickers."""
-    return platformdirs.user_data_path("niveshpy").joinpath("tickers")
+    return _get_data_dir().joinpath("tickers")
 
 
 def get_quotes_dir() -> Path:
     """Get the directory for quotes."""
-    return platformdirs.user_data_path("niveshpy").joinpath("quotes")
+    return _get_data_dir().joinpath("quotes")
 
 
 def handle_input(
     data: NiveshPyIterable,
     schema: pl.Schema | None = None,
 ) -> pl.LazyFrame:
-    """Handle input data and convert it to a Polars LazyFrame."""
+    """Handle input data and convert it to a Polars LazyFrame.
+
+    Iterables of NamedTuples are transposed into columns before building
+    the frame, so no intermediate dictionary is created per row. pandas
+    DataFrames are converted without their index and without rechunking.
+    If a schema is given, the columns it names are cast to its types.
+    """
     if isinstance(data, (pl.DataFrame, pl.LazyFrame)):
-        return data.lazy()
+        frame = data if isinstance(data, pl.LazyFrame) else data.lazy()
+        return frame if schema is None else frame.cast(schema)
+
+    # Only check for pandas frames if pandas has already been imported.
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(data, pd.DataFrame):
+        return pl.from_pandas(
+            data, schema_overrides=schema, rechunk=False, include_index=False
+        ).lazy()
+
+    rows = list(cast("Iterable[NiveshPyType]", data))
+    names: Sequence[str]
+    columns: Iterable[Sequence[Any]]
+    if rows:
+        names = rows[0]._fields
+        columns = zip(*rows)
     else:
-        return pl.from_dicts(map(lambda x: x._asdict(), data), schema=schema).lazy()
+        names = schema.names() if schema is not None else []
+        columns = repeat((), len(names))
+    return pl.DataFrame(dict(zip(names, columns)), schema=schema).lazy()
+
+
+def _collect(data: PolarsFrameType) -> pl.DataFrame:
+    """Collect a LazyFrame, passing DataFrames through unchanged."""
+    return data.collect() if isinstance(data, pl.LazyFrame) else data
+
+
+def _write_csv(data: PolarsFrameType) -> str:
+    """Write a frame to a CSV string, streaming LazyFrames into a buffer."""
+    if isinstance(data, pl.DataFrame):
+        return data.write_csv()
+    buffer = io.BytesIO()
+    data.sink_csv(buffer)
+    return buffer.getvalue().decode()
+
+
+_formatters: dict[
+    ReturnFormat | str, Callable[[PolarsFrameType], NiveshPyOutputType]
+] = {
+    ReturnFormat.DICT: lambda data: _collect(data).to_dict(as_series=False),
+    ReturnFormat.PL_DATAFRAME: _collect,
+    ReturnFormat.PL_LAZYFRAME: lambda data: (
+        data if isinstance(data, pl.LazyFrame) else data.lazy()
+    ),
+    ReturnFormat.PD_DATAFRAME: lambda data: _collect(data).to_pandas(
+        use_pyarrow_extension_array=True
+    ),
+    ReturnFormat.JSON: lambda data: _collect(data).write_json(),
+    ReturnFormat.CSV: _write_csv,
+}
+# Register the string values as well, so that formats passed as strings
+# are resolved without calling ReturnFormat(format).
+_formatters.update({format.value: _formatters[format] for format in ReturnFormat})
 
 
 def format_output(
@@ -53,24 +149,10 @@ def format_output(
     format: ReturnFormat | str,
 ) -> NiveshPyOutputType:
     """Format the output based on the specified format."""
-    data = data.lazy()
-    if isinstance(format, str):
-        format = ReturnFormat(format)
-
-    if format == ReturnFormat.DICT:
-        return data.collect().to_dict(as_series=False)
-    elif format == ReturnFormat.PL_DATAFRAME:
-        return data.collect()
-    elif format == ReturnFormat.PL_LAZYFRAME:
-        return data
-    elif format == ReturnFormat.PD_DATAFRAME:
-        return data.collect().to_pandas()
-    elif format == ReturnFormat.JSON:
-        return data.collect().write_json()
-    elif format == ReturnFormat.CSV:
-        return data.collect().write_csv()
-    else:
+    formatter = _formatters.get(format)
+    if formatter is None:
         raise ValueError(f"Unsupported format: {format}")
+    return formatter(data)
 
 
 def apply_filters(
@@ -91,37 +173,62 @@ def apply_filters(
     ...     }
 
     This will return only the records that match the specified symbol or name.
-    If filters is None, all records are returned.
+    If filters is None or empty, all records are returned. An empty
+    source_keys list also applies no restriction. A filter column with an
+    empty list of values matches no records.
     """
+    if not source_keys and not filters:
+        return frame
+    predicates = []
     if source_keys:
-        frame = frame.filter(pl.col("source_key").is_in(source_keys))
+        predicates.append(pl.col("source_key").is_in(source_keys))
     if filters:
-        columns = schema.names() if schema else frame.collect_schema().names()
-        expressions = None
-        for column, values in filters.items():
-            if column in columns:
-                if expressions is None:
-                    expressions = pl.lit(False)
-                expressions = expressions | pl.col(column).is_in(values)
-        if expressions is not None:
-            frame = frame.filter(expressions)
-    return frame
+        if schema is not None:
+            columns = set(schema.names())
+        elif isinstance(frame, pl.DataFrame):
+            columns = set(frame.columns)
+        else:
+            columns = set(frame.collect_schema().names())
+        expressions = [
+            pl.col(column).is_in(values)
+            for column, values in filters.items()
+            if column in columns
+        ]
+        if expressions:
+            predicates.append(pl.any_horizontal(expressions))
+    # Apply all predicates in a single filter so they are evaluated together.
+    return frame.filter(*predicates) if predicates else frame
 
 
 def save_tickers(tickers: PolarsFrameType) -> None:
-    """Save tickers to a parquet file partitioned by source_key."""
-    file_path = get_tickers_dir().joinpath("tickers.parquet")
-    if not file_path.parent.exists():
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-    tickers.lazy().collect().write_parquet(file_path)
+    """Save tickers to a parquet dataset partitioned by source_key."""
+    dir_path = get_tickers_dir()
+    dir_path.mkdir(parents=True, exist_ok=True)
+    # polars >= 1.29 has no PartitionByKey sink to stream a partitioned
+    # dataset to, so lazy inputs are collected and written in memory.
+    tickers.lazy().collect().write_parquet(
+        dir_path, partition_by="source_key", **_parquet_options()
+    )
 
 
 def load_tickers() -> pl.LazyFrame:
-    """Load tickers from a parquet file."""
-    file_path = get_tickers_dir().joinpath("tickers.parquet")
-    if not file_path.exists():
-        raise FileNotFoundError(f"File {file_path} does not exist.")
-    return pl.scan_parquet(file_path)
+    """Load tickers from a parquet dataset partitioned by source_key.
+
+    Tickers saved by older versions in a single tickers.parquet file are
+    migrated to the partitioned layout and the old file is removed.
+    """
+    dir_path = get_tickers_dir()
+    legacy_path = dir_path.joinpath("tickers.parquet")
+    if legacy_path.is_file():
+        logger.info("Migrating %s to a partitioned dataset", legacy_path)
+        save_tickers(pl.read_parquet(legacy_path))
+        legacy_path.unlink()
+
+    if next(dir_path.glob("source_key=*/*.parquet"), None) is None:
+        raise FileNotFoundError(f"Directory {dir_path} has no saved tickers.")
+    return pl.scan_parquet(
+        dir_path.joinpath("source_key=*", "*.parquet"), hive_partitioning=True
+    ).select("symbol", "name", "isin", "source_key", "last_updated")
 
 
 _availability_schema = pl.Schema(
@@ -144,16 +251,17 @@ def mark_quotes_as_available(
     This is only applicable for sources with ALL_TICKERS strategy.
     """
     logger.debug(
-        f"Marking quotes as available for source_key={source_key}, "
-        f"start_date={start_date}, end_date={end_date}"
+        "Marking quotes as available for source_key=%s, start_date=%s, end_date=%s",
+        source_key,
+        start_date,
+        end_date,
     )
     file_path = get_quotes_dir().joinpath("availability.parquet")
-    if not file_path.parent.exists():
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
 
     # Use a lock to ensure thread safety when writing to the file
     with _availability_lock:
-        if file_path.exists():
+        if file_path.is_file():
             df_availability = pl.read_parquet(file_path)
         else:
             df_availability = _availability_schema.to_frame(eager=True)
@@ -169,7 +277,7 @@ def mark_quotes_as_available(
             on=["source_key", "date"],
             how="full",
         )
-        df_availability.write_parquet(file_path)
+        df_availability.write_parquet(file_path, **_parquet_options())
 
 
 def check_quotes_availability(
@@ -182,7 +290,7 @@ def check_quotes_availability(
     This is only applicable for sources with ALL_TICKERS strategy.
     """
     file_path = get_quotes_dir().joinpath("availability.parquet")
-    if not file_path.exists():
+    if not file_path.is_file():
         return _availability_schema.to_frame(eager=True).select("date").to_series()
 
     df_availability = pl.read_parquet(file_path)
@@ -193,18 +301,24 @@ def check_quotes_availability(
     return df_availability.select("date").to_series()
 
 
-def save_quotes(quotes: pl.DataFrame, source_key: str) -> None:
-    """Save quotes to a parquet file."""
+def save_quotes(quotes: PolarsFrameType, source_key: str) -> None:
+    """Save quotes to a parquet file.
+
+    LazyFrames are streamed to disk, so they must not scan the file being
+    written. Collect them first if they were built from `load_quotes`.
+    """
     file_path = get_quotes_dir().joinpath(f"quotes_{source_key}.parquet")
-    if not file_path.parent.exists():
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-    quotes.write_parquet(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    if isinstance(quotes, pl.LazyFrame):
+        quotes.sink_parquet(file_path, **_parquet_options())
+    else:
+        quotes.write_parquet(file_path, **_parquet_options())
 
 
 def load_quotes(source_key: str, schema: pl.Schema) -> pl.LazyFrame:
     """Load quotes from a parquet file."""
     file_path = get_quotes_dir().joinpath(f"quotes_{source_key}.parquet")
-    if not file_path.exists():
-        logger.info(f"File {file_path} does not exist.")
+    if not file_path.is_file():
+        logger.info("File %s does not exist.", file_path)
         return schema.to_frame(eager=False)
     return pl.scan_parquet(file_path, schema=schema)
@@ -8,9 +8,11 @@ import polars as pl
 
 import pytest
 from niveshpy.main import Nivesh
+from niveshpy.models.helpers import ReturnFormat
 from niveshpy.models.plugins import Plugin, PluginInfo
 from niveshpy.models.sources import Source
 from niveshpy.models.base import OHLC, SourceInfo, SourceConfig, SourceStrategy, Ticker
+from niveshpy.utils import _parquet_options
 
 
 class DummySourcePlugin(Plugin):
@@ -89,6 +91,88 @@ class DummySource(Source):
         )
 
 
+class SourcesPlugin(DummySourcePlugin):
+    """Test plugin that provides the given sources."""
+
+    def __init__(self, *sources: Source):
+        """Initialize the plugin with its sources."""
+        super().__init__()
+        self.sources = list(sources)
+
+    def get_sources(self):
+        """Return the sources passed to the plugin."""
+        return self.sources
+
+
+class PandasSource(DummySource):
+    """Test source that returns tickers as a pandas DataFrame."""
+
+    def get_tickers(self):
+        """Get the list of tickers as a pandas DataFrame."""
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "symbol": ["pandas_ticker_1", "pandas_ticker_2"],
+                "name": ["Pandas Ticker 1", "Pandas Ticker 2"],
+                "isin": ["ISIN1000", None],
+            },
+            index=[10, 20],
+        )
+
+
+class RevisedSource(DummySource):
+    """Test source that returns revised quotes with some missing values."""
+
+    def get_quotes(self, *args, **kwargs):
+        """Get quotes overlapping the saved ones, with a missing close."""
+        return [
+            OHLC("dummy_ticker_1", date(2023, 10, 3), *[Decimal(300)] * 4),
+            OHLC("dummy_ticker_1", date(2023, 10, 2), *[Decimal(200)] * 4),
+            OHLC("dummy_ticker_1", date(2023, 10, 1), *[Decimal(150)] * 3, None),
+        ]
+
+
+class StaleSource(DummySource):
+    """Test source whose tickers are refreshed daily and lack an ISIN."""
+
+    def get_tickers(self):
+        """Get the list of tickers without ISINs."""
+        return [Ticker("dummy_ticker_1", "Dummy Ticker 1", None)]
+
+    @classmethod
+    def get_source_config(cls):
+        """Get source configuration with a daily ticker refresh."""
+        return (
+            super()
+            .get_source_config()
+            ._replace(ticker_refresh_interval=timedelta(days=1))
+        )
+
+
+class FailingSource(DummySource):
+    """Test source that fails to fetch tickers."""
+
+    def get_tickers(self):
+        """Raise an error instead of returning tickers."""
+        raise RuntimeError("Source is unavailable")
+
+    @classmethod
+    def get_source_key(cls):
+        """Get a unique key for this source."""
+        return "failing_source"
+
+
+class LazyFailingSource(FailingSource):
+    """Test source whose tickers fail to compute when collected."""
+
+    def get_tickers(self):
+        """Return a lazy frame that raises an error when collected."""
+        return pl.LazyFrame(
+            {"symbol": ["not_a_number"], "name": ["Lazy Ticker"], "isin": [None]}
+        ).with_columns(pl.col("symbol").str.to_integer().cast(pl.String()))
+
+
 def test_get_sources():
     """Test the get_sources method."""
     app = Nivesh()
@@ -170,9 +254,36 @@ def test_get_tickers_specific(mock_get_tickers_dir):
     assert "dummy_ticker_1" in tickers["symbol"]
 
     # Check if the tickers are saved to the file
-    file_path = mock_get_tickers_dir / "tickers.parquet"
-    assert file_path.exists()
-    assert file_path.stat().st_size > 0
+    file_path = mock_get_tickers_dir / "source_key=dummy_source"
+    assert file_path.is_dir()
+    assert any(file_path.glob("*.parquet"))
+
+
+def test_get_tickers_source_key_filter(mock_get_tickers_dir, mock_import_local_plugins):
+    """Test that a source_key filter skips fetching from other sources."""
+    app = Nivesh()
+    app.register_plugin(DummySourcePlugin())
+    tickers = app.get_tickers(filters={"source_key": ["other_source"]})
+
+    # Check that no tickers are returned and nothing was fetched
+    assert isinstance(tickers, dict)
+    assert tickers["symbol"] == []
+    assert not any(mock_get_tickers_dir.iterdir())
+
+
+@pytest.mark.parametrize("failing_source", [FailingSource(), LazyFailingSource()])
+def test_get_tickers_failing_source(
+    failing_source, mock_get_tickers_dir, mock_import_local_plugins
+):
+    """Test that a failing source does not prevent fetching other sources."""
+    app = Nivesh()
+    app.register_plugin(SourcesPlugin(failing_source, DummySource()))
+    tickers = app.get_tickers()
+
+    # Check that the tickers from the working source are returned
+    assert isinstance(tickers, dict)
+    assert tickers["symbol"] == ["dummy_ticker_1"]
+    assert tickers["source_key"] == ["dummy_source"]
 
 
 def test_get_tickers_local(mock_get_tickers_dir, mock_import_local_plugins):
@@ -189,7 +300,7 @@ def test_get_tickers_local(mock_get_tickers_dir, mock_import_local_plugins):
             "last_updated": [datetime(2023, 10, 1, 12, 0, 0)],
         }
     )
-    df.write_parquet(mock_get_tickers_dir / "tickers.parquet")
+    df.write_parquet(mock_get_tickers_dir, partition_by="source_key")
     tickers = app.get_tickers()
 
     # Check if the tickers are returned correctly
@@ -201,6 +312,55 @@ def test_get_tickers_local(mock_get_tickers_dir, mock_import_local_plugins):
     assert tickers["last_updated"] == [datetime(2023, 10, 1, 12, 0, 0)]
 
 
+def test_get_tickers_refresh(mock_get_tickers_dir, mock_import_local_plugins):
+    """Test that refreshed tickers overwrite the saved tickers."""
+    app = Nivesh()
+    app.register_plugin(SourcesPlugin(StaleSource()))
+
+    df = pl.DataFrame(
+        {
+            "symbol": ["dummy_ticker_1"],
+            "name": ["Dummy Ticker 1"],
+            "isin": ["ISIN0000"],
+            "source_key": ["dummy_source"],
+            "last_updated": [datetime(2023, 10, 1, 12, 0, 0)],
+        }
+    )
+    df.write_parquet(mock_get_tickers_dir, partition_by="source_key")
+    tickers = app.get_tickers()
+
+    # Check that the fetched row replaces the saved one, including nulls
+    assert isinstance(tickers, dict)
+    assert tickers["symbol"] == ["dummy_ticker_1"]
+    assert tickers["isin"] == [None]
+    assert tickers["last_updated"][0] > datetime(2023, 10, 1, 12, 0, 0)
+
+
+def test_get_tickers_legacy_file(mock_get_tickers_dir, mock_import_local_plugins):
+    """Test that tickers saved in the legacy single file are migrated."""
+    app = Nivesh()
+    app.register_plugin(DummySourcePlugin())
+
+    df = pl.DataFrame(
+        {
+            "symbol": ["dummy_ticker_2"],
+            "name": ["Dummy Ticker 2"],
+            "isin": ["ISIN0001"],
+            "source_key": ["dummy_source"],
+            "last_updated": [datetime(2023, 10, 1, 12, 0, 0)],
+        }
+    )
+    legacy_path = mock_get_tickers_dir / "tickers.parquet"
+    df.write_parquet(legacy_path)
+    tickers = app.get_tickers()
+
+    # Check that the saved tickers are returned and the file is migrated
+    assert isinstance(tickers, dict)
+    assert tickers["symbol"] == ["dummy_ticker_2"]
+    assert not legacy_path.exists()
+    assert (mock_get_tickers_dir / "source_key=dummy_source").is_dir()
+
+
 def test_get_quotes(
     mock_get_tickers_dir, mock_import_local_plugins, mock_get_quotes_dir
 ):
@@ -223,3 +383,85 @@ def test_get_quotes(
     file_path = mock_get_quotes_dir / "quotes_dummy_source.parquet"
     assert file_path.exists()
     assert file_path.stat().st_size > 0
+
+
+def test_get_quotes_merge(
+    mock_get_tickers_dir, mock_import_local_plugins, mock_get_quotes_dir
+):
+    """Test that fetched quotes are merged with the saved quotes."""
+    app = Nivesh()
+    app.register_plugin(SourcesPlugin(RevisedSource()))
+
+    saved = pl.DataFrame(
+        [
+            OHLC("dummy_ticker_1", date(2023, 10, 1), *[Decimal(100)] * 4),
+            OHLC("dummy_ticker_1", date(2023, 10, 3), *[Decimal(100)] * 4),
+        ],
+        schema=OHLC.get_polars_schema(),
+        orient="row",
+    )
+    saved.write_parquet(mock_get_quotes_dir / "quotes_dummy_source.parquet")
+
+    # The missing quote for 2023-10-02 triggers a fetch returning all three days
+    quotes = app.get_quotes(start_date=date(2023, 10, 1), end_date=date(2023, 10, 3))
+
+    # Check that new values win, except where they are missing
+    assert isinstance(quotes, dict)
+    assert quotes["date"] == [date(2023, 10, 1), date(2023, 10, 2), date(2023, 10, 3)]
+    assert quotes["open"] == [150.0, 200.0, 300.0]
+    assert quotes["close"] == [100.0, 200.0, 300.0]
+
+    # Check that the merged quotes are saved sorted by date
+    saved = pl.read_parquet(mock_get_quotes_dir / "quotes_dummy_source.parquet")
+    assert saved["date"].is_sorted()
+    assert saved["close"].to_list() == [100.0, 200.0, 300.0]
+
+
+def test_get_quotes_invalid_compression(
+    monkeypatch,
+    caplog,
+    mock_get_tickers_dir,
+    mock_import_local_plugins,
+    mock_get_quotes_dir,
+):
+    """Test that an invalid compression codec only fails when saving data."""
+    app = Nivesh()
+    app.register_plugin(DummySourcePlugin())
+    app.get_quotes(start_date=date(2023, 10, 1), end_date=date(2023, 10, 1))
+
+    # Skip the cache so the invalid value is picked up
+    monkeypatch.setenv("NIVESHPY_PARQUET_COMPRESSION", "invalid")
+    monkeypatch.setattr("niveshpy.utils._parquet_options", _parquet_options.__wrapped__)
+
+    # Check that saved quotes can still be read
+    quotes = app.get_quotes(start_date=date(2023, 10, 1), end_date=date(2023, 10, 1))
+    assert isinstance(quotes, dict)
+    assert quotes["symbol"] == ["dummy_ticker_1"]
+
+    # Check that saving newly fetched quotes fails for the source
+    app.get_quotes(start_date=date(2023, 10, 1), end_date=date(2023, 10, 2))
+    assert "Invalid NIVESHPY_PARQUET_COMPRESSION 'invalid'" in caplog.text
+
+
+def test_get_tickers_pandas_source(mock_get_tickers_dir, mock_import_local_plugins):
+    """Test that tickers returned as a pandas DataFrame are converted."""
+    pytest.importorskip("pandas")
+    app = Nivesh()
+    app.register_plugin(SourcesPlugin(PandasSource()))
+    tickers = app.get_tickers(format=ReturnFormat.PL_DATAFRAME)
+
+    assert isinstance(tickers, pl.DataFrame)
+    assert tickers.schema == pl.Schema(
+        {
+            "symbol": pl.String(),
+            "name": pl.String(),
+            "isin": pl.String(),
+            "source_key": pl.String(),
+            "last_updated": pl.Datetime(),
+        }
+    )
+    tickers = tickers.sort("symbol")
+    assert tickers["symbol"].to_list() == ["pandas_ticker_1", "pandas_ticker_2"]
+    assert tickers["name"].to_list() == ["Pandas Ticker 1", "Pandas Ticker 2"]
+    assert tickers["isin"].to_list() == ["ISIN1000", None]
+    assert tickers["source_key"].to_list() == ["dummy_source", "dummy_source"]